@@ -4,6 +4,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.sem_search import app as sem_app
 
+# Allowed CORS origins, parsed once at import
+_ORIGINS = tuple(o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip())
+
 # Main API server that mounts individual service routers
 
 def create_app() -> FastAPI:
@@ -14,10 +17,9 @@ def create_app() -> FastAPI:
     )
 
     # CORS configuration
-    origins = os.getenv("CORS_ORIGINS", "*").split(",")
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=origins,
+        allow_origins=_ORIGINS,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
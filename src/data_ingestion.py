@@ -1,18 +1,33 @@
+import io
 import os
 import argparse
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict, Tuple
 
-import pandas as pd
+import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import pyarrow.parquet as pq
-import boto3
+from boto3.s3.transfer import TransferConfig
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf  # PyMuPDF < 1.24.3 only ships the `fitz` module
+    except ImportError:
+        pymupdf = None  # Preferred (C-backed) dependency for PDF parsing
 
 try:
     from PyPDF2 import PdfReader
 except ImportError:
-    PdfReader = None  # Optional dependency for PDF parsing
+    PdfReader = None  # Optional fallback for PDF parsing
+
+from src.utils import get_aws_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,68 +36,193 @@ logger = logging.getLogger(__name__)
 def extract_text_from_pdf(path: Path) -> str:
     """
     Extracts text from a PDF file.
+
+    Uses PyMuPDF when available, keeping the document's own text order (a
+    y-then-x sort would interleave multi-column layouts); falls back to
+    PyPDF2 otherwise. Page text is written straight into one buffer; with
+    PyMuPDF each page is released before the next is loaded.
     """
+    buf = io.StringIO()
+
+    if pymupdf is not None:
+        with pymupdf.open(str(path)) as doc:
+            for i, page in enumerate(doc):
+                if i:
+                    buf.write("\n")
+                buf.write(page.get_text("text"))
+                del page
+        return buf.getvalue()
+
     if PdfReader is None:
-        raise ImportError("PyPDF2 is required for PDF parsing")
+        raise ImportError("pymupdf or PyPDF2 is required for PDF parsing")
 
     reader = PdfReader(str(path))
-    text = []
-    for page in reader.pages:
-        text.append(page.extract_text() or "")
-    return "\n".join(text)
+    for i, page in enumerate(reader.pages):
+        if i:
+            buf.write("\n")
+        buf.write(page.extract_text() or "")
+    return buf.getvalue()
+
+
+# Each CSV block must hold at least one whole row; legislative text cells can be long.
+CSV_BLOCK_SIZE = 64 << 20
+
+
+def _column_to_strings(column: pa.ChunkedArray) -> List[str]:
+    """
+    Casts an Arrow column to strings, mapping nulls to empty strings.
+    """
+    return pc.fill_null(column.cast(pa.string()), "").to_pylist()
+
+
+def _is_text_like(data_type: pa.DataType) -> bool:
+    """
+    True for columns pandas would have read as object text: anything that is
+    not numeric or boolean (dates and times are kept as text).
+    """
+    return not (
+        pa.types.is_boolean(data_type)
+        or pa.types.is_integer(data_type)
+        or pa.types.is_floating(data_type)
+        or pa.types.is_decimal(data_type)
+        or pa.types.is_null(data_type)
+    )
 
 
 def extract_text_from_csv(path: Path, text_column: str = None) -> str:
     """
     Reads a CSV/TSV and concatenates text from the specified column or all columns.
+
+    The file is memory-mapped and parsed by pyarrow's multithreaded reader
+    directly into Arrow arrays. Quoted fields may contain line breaks.
     """
-    df = pd.read_csv(path)
-    if text_column and text_column in df.columns:
-        return "\n".join(df[text_column].astype(str).tolist())
-    # Fallback: concatenate all string columns
+    delimiter = "\t" if path.suffix.lower() == ".tsv" else ","
+    with pa.memory_map(str(path)) as source:
+        table = pacsv.read_csv(
+            source,
+            read_options=pacsv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE),
+            parse_options=pacsv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+        )
+
+    if text_column and text_column in table.column_names:
+        return "\n".join(_column_to_strings(table.column(text_column)))
+    # Fallback: concatenate all text-like columns (including dates as text)
     texts = []
-    for col in df.select_dtypes(include=[object]).columns:
-        texts.extend(df[col].astype(str).tolist())
+    for field in table.schema:
+        if _is_text_like(field.type):
+            texts.extend(_column_to_strings(table.column(field.name)))
     return "\n".join(texts)
 
 
+def _chunk_starts(length: int, max_chars: int, overlap: int) -> np.ndarray:
+    """
+    Returns int64 start offsets of overlapping chunks covering length characters.
+    """
+    return np.arange(0, max(length - overlap, 1), max_chars - overlap, dtype=np.int64)
+
+
 def chunk_text(text: str, max_chars: int = 10000, overlap: int = 200) -> List[str]:
     """
     Splits text into chunks of max_chars with overlap for context.
+
+    Chunk start offsets are precomputed with NumPy so only the slicing runs in
+    Python. The final chunk always ends at the end of the text.
     """
-    chunks = []
-    start = 0
-    length = len(text)
-    while start < length:
-        end = min(start + max_chars, length)
-        chunks.append(text[start:end])
-        start = end - overlap
-    return chunks
+    if max_chars <= overlap:
+        raise ValueError("max_chars must be greater than overlap")
+    if not text:
+        return []
+
+    starts = _chunk_starts(len(text), max_chars, overlap)
+    return [text[start:start + max_chars] for start in starts.tolist()]
+
 
+PARQUET_SCHEMA = pa.schema([("id", pa.int32()), ("text", pa.large_string())])
 
-def write_parquet(chunks: List[str], output_path: Path) -> None:
+
+def write_parquet(chunks: List[str], output_path: Path, batch_size: int = 10000) -> None:
     """
     Writes a list of text chunks to a Parquet file with schema {id: int, text: str}.
+
+    Chunks are streamed as Arrow record batches of batch_size rows, so peak
+    memory stays around one row group instead of a full DataFrame + Table copy.
+    Chunk texts are effectively unique, so dictionary encoding is disabled.
     """
-    df = pd.DataFrame({"id": list(range(len(chunks))), "text": chunks})
-    table = pa.Table.from_pandas(df)
-    pq.write_table(table, str(output_path))
+    with pq.ParquetWriter(
+        str(output_path),
+        PARQUET_SCHEMA,
+        compression="zstd",
+        use_dictionary=False,
+        data_page_size=1 << 20,
+    ) as writer:
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            writer.write_batch(
+                pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(np.arange(start, start + len(batch), dtype=np.int32)),
+                        pa.array(batch, type=pa.large_string()),
+                    ],
+                    schema=PARQUET_SCHEMA,
+                )
+            )
     logger.info(f"Wrote {len(chunks)} chunks to {output_path}")
 
 
 def upload_to_s3(local_path: Path, bucket: str, key: str, region: str = None) -> None:
     """
-    Uploads a local file to S3.
+    Uploads a local file to S3 using the cached client for the region.
     """
-    session = boto3.session.Session()
-    s3 = session.client("s3", region_name=region)
+    s3 = get_aws_client("s3", region)
     s3.upload_file(str(local_path), bucket, key)
     logger.info(f"Uploaded {local_path} to s3://{bucket}/{key}")
 
 
-def process_file(path: Path, output_dir: Path, bucket: str, prefix: str, max_chars: int, overlap: int, region: str = None) -> None:
+# Multipart settings for larger Parquet files; parts are sent concurrently.
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024, max_concurrency=4, use_threads=True)
+
+
+def upload_many(pairs: Iterable[Tuple[Path, str]], bucket: str, region: str = None, max_workers: int = 32) -> None:
+    """
+    Uploads (local_path, key) pairs to S3 concurrently.
+
+    A single boto3 client is shared across threads (clients are thread-safe).
+    Each of the max_workers uploads may send up to TRANSFER_CONFIG.max_concurrency
+    parts at once, so the client's connection pool is sized to their product.
+    """
+    s3 = get_aws_client("s3", region, max_pool_connections=max_workers * TRANSFER_CONFIG.max_concurrency)
+
+    def _upload(pair: Tuple[Path, str]) -> None:
+        local_path, key = pair
+        s3.upload_file(str(local_path), bucket, key, Config=TRANSFER_CONFIG)
+        logger.info(f"Uploaded {local_path} to s3://{bucket}/{key}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(_upload, pairs))
+
+
+def parquet_name(path: Path) -> str:
+    """
+    Returns the Parquet file name (and S3 key suffix) used for an input file.
+    """
+    return f"{path.stem}.parquet"
+
+
+def process_file(
+    path: Path,
+    output_dir: Path,
+    bucket: str,
+    prefix: str,
+    max_chars: int,
+    overlap: int,
+    region: str = None,
+    upload: bool = True,
+) -> Tuple[Path, str]:
     """
     Extracts text from a single file, chunks it, writes Parquet locally, and uploads to S3.
+
+    Returns the local Parquet path and its S3 key. Pass upload=False to skip the
+    upload, e.g. when batching uploads with upload_many.
     """
     logger.info(f"Processing {path}")
     ext = path.suffix.lower()
@@ -95,11 +235,13 @@ def process_file(path: Path, output_dir: Path, bucket: str, prefix: str, max_cha
 
     chunks = chunk_text(text, max_chars=max_chars, overlap=overlap)
 
-    local_file = output_dir / f"{path.stem}.parquet"
+    local_file = output_dir / parquet_name(path)
     write_parquet(chunks, local_file)
 
     s3_key = f"{prefix}/{local_file.name}"
-    upload_to_s3(local_file, bucket, s3_key, region)
+    if upload:
+        upload_to_s3(local_file, bucket, s3_key, region)
+    return local_file, s3_key
 
 
 def main():
@@ -111,6 +253,8 @@ def main():
     parser.add_argument("--max-chars", type=int, default=10000, help="Max characters per chunk.")
     parser.add_argument("--overlap", type=int, default=200, help="Overlap characters between chunks.")
     parser.add_argument("--region", type=str, default=None, help="AWS region for S3.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument("--upload-workers", type=int, default=32, help="Number of concurrent S3 uploads.")
     args = parser.parse_args()
 
     args.output_dir.mkdir(parents=True, exist_ok=True)
@@ -119,9 +263,34 @@ def main():
     if args.input.is_dir():
         paths = list(args.input.glob("**/*"))
 
-    for path in paths:
-        if path.is_file():
-            process_file(path, args.output_dir, args.s3_bucket, args.s3_prefix, args.max_chars, args.overlap, args.region)
+    files = [path for path in paths if path.is_file()]
+
+    # Workers run concurrently, so two inputs sharing an output name would write
+    # the same Parquet file at once
+    outputs: Dict[str, Path] = {}
+    for path in files:
+        name = parquet_name(path)
+        if name in outputs:
+            parser.error(f"{outputs[name]} and {path} would both be written to {name}; rename one of them")
+        outputs[name] = path
+
+    # Parsing and Parquet encoding are CPU-bound and independent per file, so fan
+    # files out across processes. Uploads are network-bound and run afterwards on
+    # threads in this process, sharing one boto3 client.
+    worker = partial(
+        process_file,
+        output_dir=args.output_dir,
+        bucket=args.s3_bucket,
+        prefix=args.s3_prefix,
+        max_chars=args.max_chars,
+        overlap=args.overlap,
+        region=args.region,
+        upload=False,
+    )
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        pairs = list(executor.map(worker, files))
+
+    upload_many(pairs, args.s3_bucket, args.region, max_workers=args.upload_workers)
 
 if __name__ == "__main__":
     main()
@@ -2,9 +2,6 @@ import json
 import argparse
 from typing import List, Dict, Any, Tuple
 
-import numpy as np
-from sklearn.metrics import precision_score, recall_score, f1_score
-
 # Example structure for ground truth and predictions
 # ground_truth.json: [{"id": 1, "relevant": [0, 2, 5]}, ...]
 # predictions.json: [{"id": 1, "predicted": [0, 3, 5]}, ...]
@@ -32,24 +29,23 @@ def compute_metrics(
     ground_truth: Dict[int, List[int]], predictions: Dict[int, List[int]]
 ) -> Tuple[float, float, float]:
     """
-    Compute macro-averaged precision, recall, and F1 score over the dataset.
+    Compute micro-averaged precision, recall, and F1 score over the dataset.
+
+    True/false positives and false negatives are counted in a single pass
+    using set arithmetic on each document's chunk IDs.
     """
-    y_true = []
-    y_pred = []
+    tp = fp = fn = 0
 
     for doc_id, relevant in ground_truth.items():
-        pred = predictions.get(doc_id, [])
-        # Convert to binary relevance vectors
-        all_ids = sorted(set(relevant + pred))
-        true_vec = [1 if idx in relevant else 0 for idx in all_ids]
-        pred_vec = [1 if idx in pred else 0 for idx in all_ids]
-
-        y_true.extend(true_vec)
-        y_pred.extend(pred_vec)
-
-    precision = precision_score(y_true, y_pred, zero_division=0)
-    recall = recall_score(y_true, y_pred, zero_division=0)
-    f1 = f1_score(y_true, y_pred, zero_division=0)
+        relevant_ids = set(relevant)
+        pred_ids = set(predictions.get(doc_id, []))
+        tp += len(pred_ids & relevant_ids)
+        fp += len(pred_ids - relevant_ids)
+        fn += len(relevant_ids - pred_ids)
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
     return precision, recall, f1
 
 
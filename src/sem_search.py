@@ -1,6 +1,9 @@
+import asyncio
+from collections import OrderedDict
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from src.vector_store import VectorStore
 from src.rag_pipeline import RAGPipeline
@@ -22,6 +25,89 @@ rag_pipeline = RAGPipeline(
 )
 
 
+class QueryEncoder:
+    """
+    Micro-batches concurrent query encodes and caches the resulting embeddings.
+
+    Queries arriving within `window` seconds of each other are encoded in a
+    single model call, run in a worker thread so the event loop stays free.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        max_batch_size: int = 32,
+        window: float = 0.005,
+        cache_size: int = 10_000,
+    ):
+        self.store = store
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def encode(self, query: str) -> List[float]:
+        """
+        Return the normalized embedding for a query, batching with concurrent callers.
+        """
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._cache.move_to_end(query)
+            return cached
+
+        loop = asyncio.get_running_loop()
+        # Started lazily: startup events do not fire for apps mounted in api_server.
+        # Restarted when the loop changes, since a task left on a closed loop never finishes.
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((query, future))
+        embedding = await future
+
+        self._cache[query] = embedding
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return embedding
+
+    async def _next_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            try:
+                embeddings = await loop.run_in_executor(
+                    None, self.store.encode, [query for query, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings.tolist()):
+                if not future.done():
+                    future.set_result(embedding)
+
+
+query_encoder = QueryEncoder(vector_store)
+
+
 class SearchResponseItem(BaseModel):
     id: int
     score: float
@@ -55,7 +141,8 @@ async def semantic_search(
     Perform semantic search over ingested legislative data.
     """
     try:
-        hits = vector_store.search(query_text=query, top_k=top_k)
+        query_emb = await query_encoder.encode(query)
+        hits = await run_in_threadpool(vector_store.search_by_vector, query_emb, top_k=top_k)
         items = [SearchResponseItem(id=int(hit['id']), score=hit['score'], text=hit['text']) for hit in hits]
         return SearchResponse(query=query, results=items)
     except Exception as e:
@@ -30,21 +30,28 @@ def get_logger(name: str = __name__, level: str = None) -> logging.Logger:
 
 
 @lru_cache()
-def get_aws_client(service_name: str, region: str = None):
+def get_aws_client(service_name: str, region: str = None, max_pool_connections: int = 50):
     """
     Returns a boto3 client for the specified AWS service, with retry configuration.
+
+    Clients are cached per (service, region, max_pool_connections); callers that
+    share a client across threads should size the pool to their concurrency.
     """
     session = boto3.session.Session()
     region = region or os.getenv("AWS_REGION")
     config = BotoConfig(
-        retries={"max_attempts": 5, "mode": "standard"}
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": 5, "mode": "standard"},
     )
     return session.client(service_name, region_name=region, config=config)
 
 
+@lru_cache(maxsize=1)
 def load_config() -> dict:
     """
     Load and return application configuration from environment variables.
+
+    The result is cached for the life of the process; treat it as read-only.
     """
     return {
         "AWS_REGION": os.getenv("AWS_REGION"),
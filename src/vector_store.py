@@ -1,13 +1,120 @@
 import os
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Union
 
+import grpc
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qdrant_models
+from qdrant_client.http.exceptions import UnexpectedResponse
 from opensearchpy import OpenSearch, helpers
 
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+except ImportError:
+    ORTModelForFeatureExtraction = None  # Optional dependency for the ONNX backend
+
 # Initialize embedding model
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+# "torch" runs SentenceTransformer; "onnx" runs an exported graph on ONNX Runtime (CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx")
+QDRANT_UPLOAD_BATCH_SIZE = 256
+# Mean-pooled models supported by the ONNX backend, with their sentence-transformers max_seq_length
+ONNX_MEAN_POOLED_MODELS = {
+    "sentence-transformers/all-MiniLM-L6-v2": 256,
+    "sentence-transformers/all-mpnet-base-v2": 384,
+    "sentence-transformers/paraphrase-MiniLM-L6-v2": 128,
+}
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer-compatible encoder backed by ONNX Runtime.
+
+    The model is exported to ONNX on first use and cached under ONNX_MODEL_DIR;
+    embeddings are mean-pooled over the attention mask. Only models listed in
+    ONNX_MEAN_POOLED_MODELS are accepted, so the output matches the torch backend.
+    """
+
+    def __init__(self, model_name: str):
+        if model_name not in ONNX_MEAN_POOLED_MODELS:
+            raise ValueError(
+                f"ONNX embedding backend does not support {model_name}; "
+                f"supported models: {sorted(ONNX_MEAN_POOLED_MODELS)}"
+            )
+        if ORTModelForFeatureExtraction is None:
+            raise ImportError("optimum[onnxruntime] is required for the ONNX embedding backend")
+
+        export_dir = os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+        if os.path.isdir(export_dir):
+            self.model = ORTModelForFeatureExtraction.from_pretrained(export_dir, provider="CPUExecutionProvider")
+            self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        else:
+            self.model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True, provider="CPUExecutionProvider")
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model.save_pretrained(export_dir)
+            self.tokenizer.save_pretrained(export_dir)
+        self.max_seq_length = ONNX_MEAN_POOLED_MODELS[model_name]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+    ) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            batches.append((hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        if not batches:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        embeddings = np.concatenate(batches)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+def _load_sentence_transformer(name: str) -> SentenceTransformer:
+    """
+    Load a SentenceTransformer on GPU in FP16 when available, otherwise on CPU in FP32.
+    """
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(name, device=device)
+    if device == "cuda":
+        model.half()
+    return model
+
+
+@lru_cache(maxsize=4)
+def _load_model(name: str) -> Union[SentenceTransformer, OnnxSentenceEncoder]:
+    """
+    Load the embedding model for the configured EMBEDDING_BACKEND.
+
+    Cached per model name so every VectorStore in the process (e.g. the one in
+    sem_search and the one inside RAGPipeline) shares the same weights.
+    """
+    if EMBEDDING_BACKEND == "onnx":
+        return OnnxSentenceEncoder(name)
+    return _load_sentence_transformer(name)
 
 
 class VectorStore:
@@ -26,55 +133,130 @@ class VectorStore:
     ):
         self.backend = backend.lower()
         self.index_name = index_name
-        self.model = SentenceTransformer(embedding_model or EMBEDDING_MODEL)
+        self.embedding_model = embedding_model or EMBEDDING_MODEL
+        self._model: Optional[Union[SentenceTransformer, OnnxSentenceEncoder]] = None
 
         if self.backend == "qdrant":
+            # gRPC sends vectors as packed protobuf instead of JSON arrays
             self.client = QdrantClient(url=qdrant_url or os.getenv("QDRANT_URL"),
-                                       api_key=os.getenv("QDRANT_API_KEY"))
-            # Ensure collection exists
-            self.client.recreate_collection(
-                collection_name=self.index_name,
-                vectors_config=qdrant_models.VectorParams(size=self.model.get_sentence_embedding_dimension(), distance=qdrant_models.Distance.COSINE),
-            )
+                                       api_key=os.getenv("QDRANT_API_KEY"),
+                                       prefer_grpc=True,
+                                       grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+                                       timeout=30)
+            # Create collection if not exists; int8 scalar quantization keeps a compact
+            # copy of the vectors in RAM for search, with originals kept for rescoring
+            if not self._qdrant_collection_exists():
+                self.client.create_collection(
+                    collection_name=self.index_name,
+                    vectors_config=qdrant_models.VectorParams(size=self.model.get_sentence_embedding_dimension(), distance=qdrant_models.Distance.DOT),
+                    quantization_config=qdrant_models.ScalarQuantization(
+                        scalar=qdrant_models.ScalarQuantizationConfig(
+                            type=qdrant_models.ScalarType.INT8,
+                            quantile=0.99,
+                            always_ram=True,
+                        )
+                    ),
+                )
         elif self.backend == "opensearch":
             hosts = opensearch_hosts or [{"host": os.getenv("OPENSEARCH_HOST"), "port": int(os.getenv("OPENSEARCH_PORT", "9200"))}]
             self.client = OpenSearch(hosts=hosts)
-            # Create index mapping if not exists
+            # Create index mapping if not exists; embeddings get an HNSW k-NN index
             if not self.client.indices.exists(self.index_name):
                 body = {
+                    "settings": {"index.knn": True},
                     "mappings": {
                         "properties": {
-                            "embedding": {"type": "dense_vector", "dims": self.model.get_sentence_embedding_dimension()},
+                            "embedding": {
+                                "type": "knn_vector",
+                                "dimension": self.model.get_sentence_embedding_dimension(),
+                                "method": {"name": "hnsw", "engine": "nmslib", "space_type": "cosinesimil"},
+                            },
                             "text": {"type": "text"},
                         }
-                    }
+                    },
                 }
                 self.client.indices.create(index=self.index_name, body=body)
         else:
             raise ValueError(f"Unsupported backend: {backend}")
 
+    def _qdrant_collection_exists(self) -> bool:
+        """
+        Check for the Qdrant collection over either REST or gRPC transport.
+        """
+        try:
+            self.client.get_collection(collection_name=self.index_name)
+        except ValueError:  # local (in-process) mode
+            return False
+        except UnexpectedResponse as e:
+            if e.status_code == 404:
+                return False
+            raise
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                return False
+            raise
+        return True
+
+    @property
+    def model(self) -> Union[SentenceTransformer, OnnxSentenceEncoder]:
+        """
+        Embedding model, loaded on first use so constructing a store is cheap.
+        """
+        if self._model is None:
+            self._model = _load_model(self.embedding_model)
+        return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts in batches into unit-normalized embeddings.
+
+        Embeddings are normalized so dot product equals cosine similarity.
+        """
+        return self.model.encode(
+            texts,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
     def upsert(self, ids: List[int], texts: List[str]) -> None:
         """
         Encode texts and upsert into the vector store.
         """
-        embeddings = self.model.encode(texts, show_progress_bar=False).tolist()
+        embeddings = self.encode(texts)
 
         if self.backend == "qdrant":
-            points = [
-                qdrant_models.PointStruct(id=id_, vector=emb, payload={"text": txt})
-                for id_, emb, txt in zip(ids, embeddings, texts)
-            ]
-            self.client.upsert(collection_name=self.index_name, points=points)
+            ids = list(ids)
+            payloads = [{"text": txt} for txt in texts]
+            if len(ids) >= 8 * QDRANT_UPLOAD_BATCH_SIZE:
+                # Bulk loads stream batches over a worker pool. qdrant-client 1.6 does not
+                # forward `wait` for uploads, so these points become searchable asynchronously.
+                self.client.upload_collection(
+                    collection_name=self.index_name,
+                    vectors=embeddings,
+                    payload=payloads,
+                    ids=ids,
+                    parallel=min(4, os.cpu_count() or 1),
+                    batch_size=QDRANT_UPLOAD_BATCH_SIZE,
+                )
+            else:
+                # Columnar batch avoids per-point PointStructs and waits for the write
+                self.client.upsert(
+                    collection_name=self.index_name,
+                    points=qdrant_models.Batch(ids=ids, vectors=embeddings.tolist(), payloads=payloads),
+                    wait=True,
+                )
         else:  # opensearch
-            actions = []
-            for id_, emb, txt in zip(ids, embeddings, texts):
-                doc = {"embedding": emb, "text": txt}
-                actions.append({
+            actions = (
+                {
                     "_op_type": "index",
                     "_index": self.index_name,
                     "_id": id_,
-                    "_source": doc,
-                })
+                    "_source": {"embedding": emb, "text": txt},
+                }
+                for id_, emb, txt in zip(ids, embeddings.tolist(), texts)
+            )
             helpers.bulk(self.client, actions)
 
     def search(
@@ -86,8 +268,18 @@ class VectorStore:
         """
         Perform semantic search: encode query and return top_k results above threshold.
         """
-        query_emb = self.model.encode([query_text])[0].tolist()
+        query_emb = self.encode([query_text])[0].tolist()
+        return self.search_by_vector(query_emb, top_k=top_k, score_threshold=score_threshold)
 
+    def search_by_vector(
+        self,
+        query_emb: List[float],
+        top_k: int = 5,
+        score_threshold: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return top_k results above threshold for an already-encoded query.
+        """
         if self.backend == "qdrant":
             response = self.client.search(
                 collection_name=self.index_name,
@@ -101,12 +293,8 @@ class VectorStore:
             body = {
                 "size": top_k,
                 "query": {
-                    "script_score": {
-                        "query": {"match_all": {}},
-                        "script": {
-                            "source": f"cosineSimilarity(params.query_vector, 'embedding') + 1.0",
-                            "params": {"query_vector": query_emb},
-                        },
+                    "knn": {
+                        "embedding": {"vector": query_emb, "k": top_k},
                     }
                 }
             }
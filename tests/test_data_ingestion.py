@@ -1,17 +1,119 @@
 import os
+import sys
 import pandas as pd
 import pyarrow.parquet as pq
 import pytest
 
 from pathlib import Path
 from src.data_ingestion import (
+    extract_text_from_pdf,
     extract_text_from_csv,
     chunk_text,
     write_parquet,
     upload_to_s3,
+    upload_many,
+    TRANSFER_CONFIG,
+    main,
 )
 
 
+class DummyPdfPage:
+    def __init__(self, text):
+        self.text = text
+
+    def get_text(self, option):
+        return self.text
+
+    def extract_text(self):
+        return self.text
+
+
+class DummyPymupdf:
+    def __init__(self, pages):
+        self.pages = pages
+        self.opened = None
+
+    def open(self, path):
+        self.opened = path
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(DummyPdfPage(t) for t in self.pages)
+
+
+def test_extract_text_from_pdf_pymupdf(monkeypatch, tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    fake = DummyPymupdf(["page one", "page two"])
+    monkeypatch.setattr("src.data_ingestion.pymupdf", fake)
+
+    text = extract_text_from_pdf(pdf_path)
+
+    # Pages separated by a single newline, no trailing newline
+    assert text == "page one\npage two"
+    assert fake.opened == str(pdf_path)
+
+
+def test_extract_text_from_real_pdf(tmp_path):
+    from src import data_ingestion
+
+    if data_ingestion.pymupdf is None:
+        pytest.skip("PyMuPDF is not installed")
+
+    pdf_path = tmp_path / "real.pdf"
+    doc = data_ingestion.pymupdf.open()
+    for text in ["first page", "second page"]:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(pdf_path))
+    doc.close()
+
+    assert extract_text_from_pdf(pdf_path).split() == ["first", "page", "second", "page"]
+
+
+def test_extract_text_from_pdf_keeps_column_order(tmp_path):
+    from src import data_ingestion
+
+    if data_ingestion.pymupdf is None:
+        pytest.skip("PyMuPDF is not installed")
+
+    pdf_path = tmp_path / "columns.pdf"
+    doc = data_ingestion.pymupdf.open()
+    page = doc.new_page()
+    # Two columns, written column by column as a typesetter would
+    for x, label in [(72, "LEFT"), (320, "RIGHT")]:
+        for line, y in enumerate([100, 140], start=1):
+            page.insert_text((x, y), f"{label}{line}")
+    doc.save(str(pdf_path))
+    doc.close()
+
+    assert extract_text_from_pdf(pdf_path).split() == ["LEFT1", "LEFT2", "RIGHT1", "RIGHT2"]
+
+
+def test_extract_text_from_pdf_pypdf2_fallback(monkeypatch, tmp_path):
+    class DummyReader:
+        def __init__(self, path):
+            self.pages = [DummyPdfPage("first"), DummyPdfPage(None), DummyPdfPage("last")]
+
+    monkeypatch.setattr("src.data_ingestion.pymupdf", None)
+    monkeypatch.setattr("src.data_ingestion.PdfReader", DummyReader)
+
+    # Pages without extractable text contribute an empty line
+    assert extract_text_from_pdf(tmp_path / "doc.pdf") == "first\n\nlast"
+
+
+def test_extract_text_from_pdf_without_parsers(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.data_ingestion.pymupdf", None)
+    monkeypatch.setattr("src.data_ingestion.PdfReader", None)
+
+    with pytest.raises(ImportError, match="pymupdf or PyPDF2"):
+        extract_text_from_pdf(tmp_path / "doc.pdf")
+
+
 def test_extract_text_from_csv_with_column(tmp_path):
     # Prepare a CSV with a specific text column
     data = {"col1": ["hello", "world"], "col2": ["foo", "bar"]}
@@ -34,6 +136,39 @@ def test_extract_text_from_csv_without_column(tmp_path):
         assert val in text
 
 
+def test_extract_text_from_tsv(tmp_path):
+    data = {"title": ["a, b", "c"], "count": [1, 2]}
+    tsv_path = tmp_path / "test.tsv"
+    pd.DataFrame(data).to_csv(tsv_path, sep="\t", index=False)
+
+    # Commas inside fields are preserved and numeric columns are skipped
+    assert extract_text_from_csv(tsv_path) == "a, b\nc"
+
+
+def test_extract_text_from_csv_multiline_field(tmp_path):
+    csv_path = tmp_path / "multiline.csv"
+    csv_path.write_text('title,body\nBill 1,"line one\nline two"\nBill 2,short\n')
+
+    text = extract_text_from_csv(csv_path, text_column="body")
+    assert text == "line one\nline two\nshort"
+
+
+def test_extract_text_from_csv_keeps_date_columns(tmp_path):
+    csv_path = tmp_path / "dates.csv"
+    csv_path.write_text("introduced,votes\n2024-01-05,10\n2024-02-07,12\n")
+
+    # Date-looking values stay as text; numeric columns are still skipped
+    assert extract_text_from_csv(csv_path) == "2024-01-05\n2024-02-07"
+
+
+def test_extract_text_from_csv_skips_boolean_columns(tmp_path):
+    csv_path = tmp_path / "flags.csv"
+    csv_path.write_text("title,passed,introduced\nBill A,True,2024-01-05\nBill B,False,2024-02-07\n")
+
+    # Matches pandas, which read True/False as bool and left it out of the text
+    assert extract_text_from_csv(csv_path) == "Bill A\nBill B\n2024-01-05\n2024-02-07"
+
+
 def test_chunk_text_small():
     text = "a" * 25
     chunks = chunk_text(text, max_chars=10, overlap=2)
@@ -41,6 +176,14 @@ def test_chunk_text_small():
     assert len(chunks) == 3
     # Each chunk length <= max_chars
     assert all(len(c) <= 10 for c in chunks)
+    # Consecutive chunks share `overlap` characters and the last reaches the end
+    assert chunks[0][-2:] == chunks[1][:2]
+    assert chunks[-1] == text[16:]
+
+
+def test_chunk_text_rejects_overlap_not_smaller_than_max_chars():
+    with pytest.raises(ValueError):
+        chunk_text("abc", max_chars=2, overlap=2)
 
 
 def test_write_and_read_parquet(tmp_path):
@@ -68,10 +211,10 @@ def test_upload_to_s3(monkeypatch, tmp_path):
             calls['Bucket'] = Bucket
             calls['Key'] = Key
 
-    # Monkeypatch boto3 session client
+    # Monkeypatch the cached AWS client factory
     monkeypatch.setattr(
-        'boto3.session.Session.client',
-        lambda self, service, region_name=None: DummyClient()
+        'src.data_ingestion.get_aws_client',
+        lambda service, region=None: DummyClient()
     )
 
     upload_to_s3(local_file, bucket="test-bucket", key="pref/dummy.txt")
@@ -79,3 +222,52 @@ def test_upload_to_s3(monkeypatch, tmp_path):
     assert calls['Bucket'] == "test-bucket"
     assert calls['Key'] == "pref/dummy.txt"
     assert calls['Filename'] == str(local_file)
+
+
+def test_upload_many(monkeypatch, tmp_path):
+    files = []
+    for name in ["a.parquet", "b.parquet"]:
+        local_file = tmp_path / name
+        local_file.write_text("content")
+        files.append((local_file, f"pref/{name}"))
+
+    uploaded = []
+    clients = []
+
+    class DummyClient:
+        def upload_file(self, Filename, Bucket, Key, Config=None):
+            uploaded.append((Filename, Bucket, Key))
+
+    def make_client(service, region=None, max_pool_connections=50):
+        clients.append((service, max_pool_connections))
+        return DummyClient()
+
+    monkeypatch.setattr('src.data_ingestion.get_aws_client', make_client)
+
+    upload_many(files, bucket="test-bucket", max_workers=8)
+
+    # One shared client serves every upload, with a pool covering all parts in flight
+    assert clients == [("s3", 8 * TRANSFER_CONFIG.max_concurrency)]
+    assert sorted(uploaded) == sorted(
+        (str(path), "test-bucket", key) for path, key in files
+    )
+
+
+def test_main_rejects_colliding_output_names(monkeypatch, tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "x.txt").write_text("one")
+    (tmp_path / "b" / "x.txt").write_text("two")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("nothing should be processed")
+
+    monkeypatch.setattr('src.data_ingestion.ProcessPoolExecutor', fail)
+    monkeypatch.setattr(sys, "argv", [
+        "data_ingestion", "--input", str(tmp_path),
+        "--output-dir", str(tmp_path / "out"), "--s3-bucket", "test-bucket",
+    ])
+
+    # Both files map to x.parquet, so the run is refused before any work starts
+    with pytest.raises(SystemExit):
+        main()
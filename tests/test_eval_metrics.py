@@ -0,0 +1,21 @@
+import pytest
+
+from src.eval_metrics import compute_metrics
+
+
+def test_compute_metrics_micro_averaged():
+    ground_truth = {1: [0, 2, 5], 2: [1]}
+    predictions = {1: [0, 3, 5], 2: [1, 4]}
+
+    precision, recall, f1 = compute_metrics(ground_truth, predictions)
+
+    # TP = 3 (0, 5, 1), FP = 2 (3, 4), FN = 1 (2)
+    assert precision == pytest.approx(3 / 5)
+    assert recall == pytest.approx(3 / 4)
+    assert f1 == pytest.approx(2 * (3 / 5) * (3 / 4) / (3 / 5 + 3 / 4))
+
+
+def test_compute_metrics_missing_predictions():
+    precision, recall, f1 = compute_metrics({1: [0, 1]}, {})
+
+    assert (precision, recall, f1) == (0.0, 0.0, 0.0)
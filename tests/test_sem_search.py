@@ -0,0 +1,103 @@
+import asyncio
+import gc
+import importlib
+import sys
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def QueryEncoder():
+    # Avoid building real backends when sem_search creates its module-level services
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("src.vector_store.VectorStore", lambda *args, **kwargs: None)
+        mp.setattr("src.rag_pipeline.RAGPipeline", lambda *args, **kwargs: None)
+        sys.modules.pop("src.sem_search", None)
+        module = importlib.import_module("src.sem_search")
+    yield module.QueryEncoder
+    sys.modules.pop("src.sem_search", None)
+
+
+class DummyStore:
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        if self.error:
+            raise self.error
+        return np.array([[float(len(t))] for t in texts])
+
+
+def test_concurrent_queries_are_batched(QueryEncoder):
+    store = DummyStore()
+    encoder = QueryEncoder(store)
+
+    async def run():
+        return await asyncio.gather(*(encoder.encode(q) for q in ["a", "bb", "ccc"]))
+
+    assert asyncio.run(run()) == [[1.0], [2.0], [3.0]]
+    # All three callers were served by a single model call
+    assert store.calls == [["a", "bb", "ccc"]]
+
+
+def test_cached_query_skips_encode(QueryEncoder):
+    store = DummyStore()
+    encoder = QueryEncoder(store)
+
+    async def run():
+        first = await encoder.encode("hello")
+        second = await encoder.encode("hello")
+        return first, second
+
+    assert asyncio.run(run()) == ([5.0], [5.0])
+    assert store.calls == [["hello"]]
+
+
+def test_cache_evicts_least_recently_used(QueryEncoder):
+    store = DummyStore()
+    encoder = QueryEncoder(store, cache_size=2)
+
+    async def run():
+        for query in ["a", "b", "a", "c", "a", "b"]:
+            await encoder.encode(query)
+
+    asyncio.run(run())
+    # "a" stays cached after being reused; "b" is evicted when "c" arrives
+    assert store.calls == [["a"], ["b"], ["c"], ["b"]]
+
+
+def test_encode_error_reaches_every_waiter(QueryEncoder):
+    store = DummyStore(error=RuntimeError("model failed"))
+    encoder = QueryEncoder(store)
+
+    async def run():
+        return await asyncio.gather(
+            *(encoder.encode(q) for q in ["a", "b"]), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert len(store.calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+# The abandoned worker is garbage-collected on a closed loop, which Python reports as unraisable
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+def test_worker_restarts_on_new_event_loop(QueryEncoder):
+    store = DummyStore()
+    encoder = QueryEncoder(store)
+
+    # First loop is closed with the worker task still pending
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(encoder.encode("a")) == [1.0]
+    loop.close()
+    gc.collect()
+
+    async def run():
+        return await asyncio.wait_for(encoder.encode("bb"), timeout=1)
+
+    assert asyncio.run(run()) == [2.0]
+    # The replaced worker is only unreachable now; collect it while the warning is filtered
+    gc.collect()
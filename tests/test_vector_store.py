@@ -1,5 +1,8 @@
+import grpc
+import numpy as np
 import pytest
-from src.vector_store import VectorStore
+from qdrant_client.http.exceptions import UnexpectedResponse
+from src.vector_store import VectorStore, OnnxSentenceEncoder, _load_model
 from sentence_transformers import SentenceTransformer
 
 
@@ -8,25 +11,39 @@ class DummyModel(SentenceTransformer):
         # No super init
         pass
 
-    def encode(self, texts, show_progress_bar=False):
-        # Return fixed embeddings: list of lists
-        return [[float(len(t))] for t in texts]
+    def encode(self, texts, **kwargs):
+        # Return fixed embeddings: one row per text
+        return np.array([[float(len(t))] for t in texts])
 
     def get_sentence_embedding_dimension(self):
         return 1
 
 
 class DummyQdrantClient:
-    def __init__(self):
+    def __init__(self, collections=(), missing_error=None):
         self.upserted = []
+        self.uploaded = []
         self.searched = []
+        self.collections = set(collections)
+        self.created = []
+        self.missing_error = missing_error
+
+    def get_collection(self, collection_name):
+        if collection_name not in self.collections:
+            raise self.missing_error or ValueError(f"Collection {collection_name} not found")
 
-    def recreate_collection(self, collection_name, vectors_config):
+    def create_collection(self, collection_name, vectors_config, quantization_config=None):
         # simulate collection creation
-        self.collection = collection_name
+        self.collections.add(collection_name)
+        self.created.append(collection_name)
 
-    def upsert(self, collection_name, points):
-        self.upserted.append((collection_name, points))
+    def upsert(self, collection_name, points, wait=False):
+        self.upserted.append((collection_name, points.ids, points.payloads))
+        self.upsert_wait = wait
+
+    def upload_collection(self, collection_name, vectors, payload, ids, parallel=1, batch_size=64, **kwargs):
+        self.uploaded.append((collection_name, ids, payload))
+        self.upload_parallel = parallel
 
     def search(self, collection_name, query_vector, limit):
         # simulate returning dummy hits
@@ -53,10 +70,12 @@ class DummyOpenSearch:
 
         def create(self, index, body):
             self.parent.index_name = index
+            self.parent.created_body = body
 
     def search(self, index, body):
         # simulate search response
-        return {'hits': {'hits': [{'_id': 2, '_score': 1.0, '_source': {'text': 'foo', 'embedding': [0.1]}}]}}
+        self.search_body = body
+        return {'hits': {'hits': [{'_id': '2', '_score': 1.0, '_source': {'text': 'foo', 'embedding': [0.1]}}]}}
 
     @property
     def indices(self):
@@ -67,14 +86,19 @@ def test_qdrant_upsert_and_search(monkeypatch):
     # Patch model and client
     monkeypatch.setattr(VectorStore, 'model', DummyModel())
     monkeypatch.setenv('QDRANT_URL', 'http://fake')
+    monkeypatch.setattr('src.vector_store.QdrantClient', lambda **kwargs: DummyQdrantClient())
     # Create VectorStore with dummy client
     vs = VectorStore(backend='qdrant', index_name='test')
-    vs.client = DummyQdrantClient()
+    assert vs.client.created == ['test']
 
     # Test upsert
     vs.upsert(ids=[1], texts=['hello'])
     assert vs.client.upserted[0][0] == 'test'
-    assert vs.client.upserted[0][1][0].payload['text'] == 'hello'
+    assert vs.client.upserted[0][1] == [1]
+    assert vs.client.upserted[0][2][0]['text'] == 'hello'
+    # Small upserts are one request that blocks until the write is applied
+    assert vs.client.upsert_wait is True
+    assert vs.client.uploaded == []
 
     # Test search
     results = vs.search(query_text='hi', top_k=1)
@@ -82,18 +106,207 @@ def test_qdrant_upsert_and_search(monkeypatch):
     assert results[0]['text'] == 'dummy'
 
 
+def test_qdrant_bulk_upsert_uses_parallel_upload(monkeypatch):
+    monkeypatch.setattr(VectorStore, 'model', DummyModel())
+    monkeypatch.setattr('src.vector_store.QdrantClient', lambda **kwargs: DummyQdrantClient())
+    vs = VectorStore(backend='qdrant', index_name='test')
+
+    n = 8 * 256
+    vs.upsert(ids=list(range(n)), texts=['x'] * n)
+
+    assert vs.client.upserted == []
+    assert vs.client.uploaded[0][1] == list(range(n))
+    assert vs.client.upload_parallel >= 1
+
+
+def test_qdrant_existing_collection_skips_model_load(monkeypatch):
+    def fail_load(name):
+        raise AssertionError("model should not be loaded")
+
+    monkeypatch.setattr('src.vector_store._load_model', fail_load)
+    monkeypatch.setattr(
+        'src.vector_store.QdrantClient',
+        lambda **kwargs: DummyQdrantClient(collections={'test'}),
+    )
+
+    vs = VectorStore(backend='qdrant', index_name='test')
+    # Existing collection is reused, not dropped and re-created
+    assert vs.client.created == []
+
+
+def test_qdrant_http_404_creates_collection(monkeypatch):
+    monkeypatch.setattr(VectorStore, 'model', DummyModel())
+    error = UnexpectedResponse(404, "Not Found", b"", {})
+    monkeypatch.setattr(
+        'src.vector_store.QdrantClient',
+        lambda **kwargs: DummyQdrantClient(missing_error=error),
+    )
+
+    vs = VectorStore(backend='qdrant', index_name='test')
+    assert vs.client.created == ['test']
+
+
+def test_qdrant_http_error_is_not_treated_as_missing(monkeypatch):
+    monkeypatch.setattr(VectorStore, 'model', DummyModel())
+    error = UnexpectedResponse(401, "Unauthorized", b"", {})
+    monkeypatch.setattr(
+        'src.vector_store.QdrantClient',
+        lambda **kwargs: DummyQdrantClient(missing_error=error),
+    )
+
+    with pytest.raises(UnexpectedResponse):
+        VectorStore(backend='qdrant', index_name='test')
+
+
+class DummyRpcError(grpc.RpcError):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def code(self):
+        return self.status_code
+
+
+def test_qdrant_grpc_not_found_creates_collection(monkeypatch):
+    monkeypatch.setattr(VectorStore, 'model', DummyModel())
+    monkeypatch.setattr(
+        'src.vector_store.QdrantClient',
+        lambda **kwargs: DummyQdrantClient(missing_error=DummyRpcError(grpc.StatusCode.NOT_FOUND)),
+    )
+
+    vs = VectorStore(backend='qdrant', index_name='test')
+    assert vs.client.created == ['test']
+
+
+def test_qdrant_grpc_error_is_reraised(monkeypatch):
+    monkeypatch.setattr(VectorStore, 'model', DummyModel())
+    monkeypatch.setattr(
+        'src.vector_store.QdrantClient',
+        lambda **kwargs: DummyQdrantClient(missing_error=DummyRpcError(grpc.StatusCode.UNAVAILABLE)),
+    )
+
+    with pytest.raises(grpc.RpcError):
+        VectorStore(backend='qdrant', index_name='test')
+
+
+def test_vector_stores_share_model(monkeypatch):
+    loads = []
+
+    def fake_load(name):
+        loads.append(name)
+        return DummyModel()
+
+    monkeypatch.setattr('src.vector_store._load_sentence_transformer', fake_load)
+    monkeypatch.setattr(
+        'src.vector_store.QdrantClient',
+        lambda **kwargs: DummyQdrantClient(collections={'test'}),
+    )
+    _load_model.cache_clear()
+
+    first = VectorStore(backend='qdrant', index_name='test', embedding_model='dummy')
+    second = VectorStore(backend='qdrant', index_name='test', embedding_model='dummy')
+
+    assert first.model is second.model
+    assert loads == ['dummy']
+    _load_model.cache_clear()
+
+
+class DummyTokenizer:
+    @classmethod
+    def from_pretrained(cls, name):
+        return cls()
+
+    def save_pretrained(self, path):
+        pass
+
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        # One token per word, right-padded to the longest text in the batch
+        lengths = [min(len(t.split()), max_length) for t in texts]
+        width = max(lengths)
+        mask = np.array([[1] * n + [0] * (width - n) for n in lengths])
+        return {"input_ids": np.ones_like(mask), "attention_mask": mask}
+
+
+class DummyOrtModel:
+    config = type("Config", (), {"hidden_size": 2})()
+
+    @classmethod
+    def from_pretrained(cls, name, export=False, provider=None):
+        return cls()
+
+    def save_pretrained(self, path):
+        pass
+
+    def __call__(self, input_ids, attention_mask):
+        # Real token j has hidden state [j + 1, 1]; padding gets large values
+        positions = np.arange(1, attention_mask.shape[1] + 1, dtype=np.float32)
+        hidden = np.stack([np.broadcast_to(positions, attention_mask.shape), np.ones(attention_mask.shape)], axis=-1)
+        hidden = np.where(attention_mask[..., None] == 1, hidden, 100.0).astype(np.float32)
+        return type("Output", (), {"last_hidden_state": hidden})()
+
+
+@pytest.fixture
+def onnx_encoder(monkeypatch, tmp_path):
+    monkeypatch.setattr('src.vector_store.ORTModelForFeatureExtraction', DummyOrtModel)
+    monkeypatch.setattr('src.vector_store.AutoTokenizer', DummyTokenizer, raising=False)
+    monkeypatch.setattr('src.vector_store.ONNX_MODEL_DIR', str(tmp_path))
+    return OnnxSentenceEncoder("sentence-transformers/all-MiniLM-L6-v2")
+
+
+def test_onnx_encoder_masked_mean_pooling(onnx_encoder):
+    embeddings = onnx_encoder.encode(["a b", "a b c d"], batch_size=2)
+
+    # Padding positions are excluded from the mean
+    np.testing.assert_allclose(embeddings, [[1.5, 1.0], [2.5, 1.0]])
+    assert onnx_encoder.max_seq_length == 256
+
+
+def test_onnx_encoder_normalizes_and_handles_empty_input(onnx_encoder):
+    embeddings = onnx_encoder.encode(["a b", "a b c d"], batch_size=1, normalize_embeddings=True)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), [1.0, 1.0], rtol=1e-6)
+    np.testing.assert_allclose(embeddings[0], np.array([1.5, 1.0]) / np.hypot(1.5, 1.0), rtol=1e-6)
+
+    assert onnx_encoder.encode([]).shape == (0, 2)
+
+
+def test_onnx_encoder_rejects_unknown_model():
+    with pytest.raises(ValueError, match="does not support"):
+        OnnxSentenceEncoder("some-org/cls-pooled-model")
+
+
 def test_opensearch_upsert_and_search(monkeypatch):
-    # Patch model
+    # Patch model and client
     monkeypatch.setattr(VectorStore, 'model', DummyModel())
+    monkeypatch.setattr('src.vector_store.OpenSearch', lambda **kwargs: DummyOpenSearch())
+    bulk_actions = []
+    monkeypatch.setattr(
+        'src.vector_store.helpers.bulk',
+        lambda client, actions: bulk_actions.extend(actions),
+    )
     # Create VectorStore with fake OpenSearch client
     vs = VectorStore(backend='opensearch', index_name='test_os')
-    vs.client = DummyOpenSearch()
+
+    # Index is created with an HNSW k-NN mapping
+    body = vs.client.created_body
+    assert body['settings'] == {'index.knn': True}
+    embedding = body['mappings']['properties']['embedding']
+    assert embedding['type'] == 'knn_vector'
+    assert embedding['dimension'] == 1
+    assert embedding['method'] == {'name': 'hnsw', 'engine': 'nmslib', 'space_type': 'cosinesimil'}
 
     # Test upsert
     vs.upsert(ids=[2], texts=['world'])
-    # verify no exception
+    assert bulk_actions == [{
+        '_op_type': 'index',
+        '_index': 'test_os',
+        '_id': 2,
+        '_source': {'embedding': [5.0], 'text': 'world'},
+    }]
 
     # Test search
     results = vs.search(query_text='anything', top_k=1)
+    assert vs.client.search_body == {
+        'size': 1,
+        'query': {'knn': {'embedding': {'vector': [8.0], 'k': 1}}},
+    }
     assert results[0]['id'] == '2'
     assert 'foo' in results[0]['text']